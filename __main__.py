@@ -0,0 +1,66 @@
+"""
+Command-line entry point for cosmotile.
+
+Run as `python -m cosmotile <command> ...`. healpy and astropy are only
+imported once a command that needs them starts running, so short per-channel
+jobs do not pay their import time up front.
+
+"""
+from __future__ import print_function, division
+
+import time
+_START = time.time()
+
+import argparse
+import sys
+
+from . import cube2hpx, hpx2sin, hpxcoord, interpcube
+
+
+COMMANDS = {'cube2hpx': (cube2hpx, 'Tile and grid a 21 cm simulation cube '
+                                   'to a HEALPix map.'),
+            'hpx2sin': (hpx2sin, 'Generate a SIN (orthographic) projected '
+                                 'FITS image from a HEALPix map.'),
+            'hpxcoord': (hpxcoord, 'Build the HEALPix pixel vector '
+                                   'coordinate cache used by cube2hpx.'),
+            'interpcube': (interpcube, 'Linearly interpolate between 21 cm '
+                                       'simulation cubes.')}
+
+
+def build_parser():
+    """Build the `cosmotile` argument parser with one sub-command per stage."""
+    parser = argparse.ArgumentParser(
+        prog='cosmotile',
+        description='Grid and tile 21 cm cubes to HEALPix and SIN projected '
+                    'maps.')
+    parser.add_argument('--timing', action='store_true',
+                        help='Report import, startup and run time to stderr.')
+    subparsers = parser.add_subparsers(dest='command')
+    for name in sorted(COMMANDS):
+        module, description = COMMANDS[name]
+        module.add_arguments(subparsers.add_parser(
+            name, help=description, description=description,
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter))
+    return parser
+
+
+def main(argv=None):
+    import_time = time.time() - _START
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_help()
+        return 2
+    startup_time = time.time() - _START
+    module = COMMANDS[args.command][0]
+    module.main(args)
+    if args.timing:
+        print('cosmotile {:s}: import {:.3f} s, startup {:.3f} s, '
+              'run {:.3f} s'.format(args.command, import_time, startup_time,
+                                    time.time() - _START - startup_time),
+              file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
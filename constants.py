@@ -19,10 +19,10 @@ ZENITH = {'EoR0': (0.0, -26.7033),
           'EoR2': (10.33, -26.7033)}
 
 # MWA EoR central frequencies.
-FREQ = {'EoR_low_40kHz': np.array([138.895 + 0.04 * i for i in range(704)]),
-        'EoR_hi_40kHz': np.array([167.055 + 0.04 * i for i in range(705)]),
-        'EoR_all_40kHz': np.array([138.895 + 0.04 * i for i in range(1409)]),
-        'EoR_low_80kHz': np.array([138.915 + 0.08 * i for i in range(352)]),
-        'EoR_hi_80kHz': np.array([167.075 + 0.08 * i for i in range(353)]),
-        'EoR_all_80kHz': np.array([138.915 + 0.08 * i for i in range(705)]),
-        '21cm':1420.40575177}
\ No newline at end of file
+FREQ = {'EoR_low_40kHz': 138.895 + 0.04 * np.arange(704),
+        'EoR_hi_40kHz': 167.055 + 0.04 * np.arange(705),
+        'EoR_all_40kHz': 138.895 + 0.04 * np.arange(1409),
+        'EoR_low_80kHz': 138.915 + 0.08 * np.arange(352),
+        'EoR_hi_80kHz': 167.075 + 0.08 * np.arange(353),
+        'EoR_all_80kHz': 138.915 + 0.08 * np.arange(705),
+        '21cm': 1420.40575177}
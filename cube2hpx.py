@@ -7,11 +7,14 @@ Created: August 19, 2013
 from __future__ import print_function, division
 
 import argparse
-import os
 
 import numpy as np
-import healpy as hp
-from astropy.cosmology import WMAP9
+
+try:
+    from .hpxcoord import healpix_coord_cache
+except (ImportError, ValueError):
+    # Run as a script rather than as part of the package.
+    from hpxcoord import healpix_coord_cache
 
 
 def cube2hpx(simfile, hpxfile, freq, nside=4096, sim_res=7.8125,
@@ -27,8 +30,18 @@ def cube2hpx(simfile, hpxfile, freq, nside=4096, sim_res=7.8125,
         Frequency of interest in MHz.
     nside: integer
         NSIDE of the output HEALPix image. Must be a valid NSIDE for HEALPix.
+    healpix_coord_files: string or None
+        Numpy binary file (*.npy) caching the vector coordinates of the
+        HEALPix pixels. Created with `hpxcoord.healpix_coord_cache` if it
+        does not exist. Default to 'healpix_coord_N<nside>.npy'. Build it
+        before running many cube2hpx calls in parallel.
 
     """
+    # healpy and astropy.cosmology are slow to import, so only pay for them
+    # when a map is actually being made.
+    import healpy as hp
+    from astropy.cosmology import WMAP9
+
     # Read in and interpolate simulation cubes to the redshift of interest.
     cube = np.load(simfile)
 
@@ -39,12 +52,7 @@ def cube2hpx(simfile, hpxfile, freq, nside=4096, sim_res=7.8125,
     dc = WMAP9.comoving_distance(z21).value
 
     # Get the vector coordinates (vx, vy, vz) of the HEALPIX pixels.
-    if not healpix_coord_files:
-        healpix_coord_files = 'healpix_coord_N{:d}.npy'.format(nside)
-    if os.path.isfile(healpix_coord_files):
-        vx, vy, vz = np.load(healpix_coord_files)
-    else:
-        vx, vy, vz = hp.pix2vec(nside, np.arange(hp.nside2npix(nside)))
+    vx, vy, vz = healpix_coord_cache(nside, healpix_coord_files)
 
     # Translate vector coordinates to comoving coordinates and determine the
     # corresponding cube indexes (xi, yi, zi). For faster operation, we will
@@ -61,10 +69,9 @@ def cube2hpx(simfile, hpxfile, freq, nside=4096, sim_res=7.8125,
     # TODO: Add BUNIT
 
 
-if __name__ == '__main__':
+def add_arguments(parser):
+    """Add the cube2hpx command-line arguments to an argparse parser."""
     convert_string = lambda string: [int(s) for s in string.split()]
-    parser = argparse.ArgumentParser(
-        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
     parser.add_argument('simfile', type=str,
                         help='Name of an input temperature simulation cube file.')
     parser.add_argument('fitsfile', type=str,
@@ -81,6 +88,16 @@ if __name__ == '__main__':
                         help='Pixel size of the simulation cube in Mpc/h')
     parser.add_argument('--read_column', '--col', type=str,
                         help='Column in simfile to read')
-    args = parser.parse_args()
+    return parser
+
+
+def main(args):
+    """Run cube2hpx from parsed command-line arguments."""
     cube2hpx(args.simfile, args.fitsfile, args.freq, nside=args.nside,
              sim_res=args.sim_res, sim_size=args.sim_size)
+
+
+if __name__ == '__main__':
+    parser = add_arguments(argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter))
+    main(parser.parse_args())
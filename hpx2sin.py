@@ -12,9 +12,6 @@ import argparse
 from datetime import datetime
 
 import numpy as np
-import healpy as hp
-from astropy import wcs
-from astropy.io import fits
 
 
 def hpx2sin(hpxfile, fitsfile, ra, dec, size=7480, res=0.015322941176470588,
@@ -58,6 +55,12 @@ def hpx2sin(hpxfile, fitsfile, ra, dec, size=7480, res=0.015322941176470588,
 
 
     """
+    # healpy and astropy are slow to import, so only pay for them when an
+    # image is actually being made.
+    import healpy as hp
+    from astropy import wcs
+    from astropy.io import fits
+
     print('hpx2sin {:s} {:s} {:.3f} {:.3f} {:d} {:f}'
           .format(hpxfile, fitsfile, ra, dec, size, res))
     if not hpx_array:
@@ -118,11 +121,8 @@ def hpx2sin(hpxfile, fitsfile, ra, dec, size=7480, res=0.015322941176470588,
     hdu.writeto(fitsfile, clobber=True)
 
 
-# Command-line paarsing
-if __name__ == '__main__':
-    parser = argparse.ArgumentParser(
-        description='Generate a SIN (orthographic) projected FITS images from '
-                    'a HEALPix image.')
+def add_arguments(parser):
+    """Add the hpx2sin command-line arguments to an argparse parser."""
     parser.add_argument('hpxfile', type=str,
                         help='Path to an input HEALPix file')
     parser.add_argument('fitsfile', type=str,
@@ -145,6 +145,18 @@ if __name__ == '__main__':
                              "'C' for Celestial (default).")
     parser.add_argument('-m', '--multiplier', type=float, default=1,
                         help="Multiplier to HEALPix map before gridding.")
-    args = parser.parse_args()
+    return parser
+
+
+def main(args):
+    """Run hpx2sin from parsed command-line arguments."""
     hpx2sin(args.hpxfile, args.fitsfile, args.ra, args.dec, size=args.size,
             res=args.res, hpx_coord=args.coord, hpx_multiplier=args.multiplier)
+
+
+# Command-line paarsing
+if __name__ == '__main__':
+    parser = add_arguments(argparse.ArgumentParser(
+        description='Generate a SIN (orthographic) projected FITS images from '
+                    'a HEALPix image.'))
+    main(parser.parse_args())
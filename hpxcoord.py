@@ -0,0 +1,179 @@
+"""
+Build and cache the vector coordinates of HEALPix pixels.
+
+The pixel range is split into chunks that are converted on a thread pool and
+written straight into a preallocated (3, npix) array, optionally memory-mapped
+to a numpy binary file that cube2hpx can later load as its coordinate cache.
+
+"""
+from __future__ import print_function, division
+
+import argparse
+import os
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
+
+import numpy as np
+
+
+def healpix_vectors(nside, pix=None, outfile=None, nthreads=None,
+                    chunk_size=1048576, nest=False):
+    """
+    Compute the (vx, vy, vz) unit vectors of HEALPix pixels in parallel.
+
+    Parameters
+    ----------
+    nside: integer
+        NSIDE of the HEALPix map. Must be a valid NSIDE for HEALPix.
+    pix: array of integer or None, optional
+        Pixel indexes to compute, e.g. a sky cut. All pixels if None.
+    outfile: string or None, optional
+        Path to a numpy binary file (*.npy) to write the vectors to. The
+        output is memory-mapped to this file instead of held in memory.
+        The file is written under a temporary name and moved in place when
+        complete, so other processes never load a partial cache.
+    nthreads: integer or None, optional
+        Number of threads. Default to the number of CPUs.
+    chunk_size: integer, optional
+        Number of pixels converted per task.
+    nest: bool, optional
+        Use NESTED instead of RING pixel ordering.
+
+    Return
+    ------
+    out: array of float, shape (3, len(pix))
+        Vector coordinates of the pixels. Memory-mapped read-only from
+        `outfile` if given.
+
+    """
+    import healpy as hp
+
+    # Check these before allocating the output, otherwise no chunk is
+    # computed and an empty or all-zero cache is returned.
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be at least 1.')
+    if nthreads is not None and nthreads < 1:
+        raise ValueError('nthreads must be at least 1.')
+
+    if pix is None:
+        npix = hp.nside2npix(nside)
+    else:
+        pix = np.asarray(pix)
+        npix = len(pix)
+
+    # Only one chunk of pixel indexes exists at a time per thread, so the
+    # full int64 range of pixels is never allocated.
+    def fill(start):
+        stop = min(start + chunk_size, npix)
+        if pix is None:
+            ipix = np.arange(start, stop)
+        else:
+            ipix = pix[start:stop]
+        out[:, start:stop] = hp.pix2vec(nside, ipix, nest=nest)
+
+    if outfile is not None:
+        tmpfile = '{:s}.{:d}.tmp.npy'.format(outfile, os.getpid())
+    try:
+        if outfile is not None:
+            out = np.lib.format.open_memmap(tmpfile, mode='w+',
+                                            dtype=np.float64, shape=(3, npix))
+        else:
+            out = np.empty((3, npix), dtype=np.float64)
+        if nthreads is None:
+            nthreads = cpu_count()
+        pool = ThreadPool(nthreads)
+        try:
+            pool.map(fill, range(0, npix, chunk_size))
+        finally:
+            pool.close()
+            pool.join()
+        if outfile is None:
+            return out
+        out.flush()
+        os.rename(tmpfile, outfile)
+    except BaseException:
+        if outfile is not None and os.path.isfile(tmpfile):
+            os.remove(tmpfile)
+        raise
+    return np.load(outfile, mmap_mode='r')
+
+
+def healpix_coord_cache(nside, filename=None, nthreads=None):
+    """
+    Load the RING-ordered, full-sky pixel vectors used by cube2hpx.
+
+    The cache is built with `healpix_vectors` if it does not exist. When many
+    processes use the same cache, call this once before starting them so that
+    they do not each build it.
+
+    Parameters
+    ----------
+    nside: integer
+        NSIDE of the HEALPix map. Must be a valid NSIDE for HEALPix.
+    filename: string or None, optional
+        Path to the cache file. Default to 'healpix_coord_N<nside>.npy'.
+    nthreads: integer or None, optional
+        Number of threads used to build the cache. Default to the number
+        of CPUs.
+
+    Return
+    ------
+    out: array of float, shape (3, 12 * nside ** 2)
+        Vector coordinates of all pixels, memory-mapped read-only.
+
+    """
+    if not filename:
+        filename = 'healpix_coord_N{:d}.npy'.format(nside)
+    if os.path.isfile(filename):
+        out = np.load(filename, mmap_mode='r')
+    else:
+        out = healpix_vectors(nside, outfile=filename, nthreads=nthreads)
+    if out.shape != (3, 12 * nside ** 2):
+        raise ValueError('{:s} has shape {} but a full-sky cache for nside '
+                         '{:d} must have shape (3, {:d}).'
+                         .format(filename, out.shape, nside, 12 * nside ** 2))
+    return out
+
+
+def add_arguments(parser):
+    """Add the hpxcoord command-line arguments to an argparse parser."""
+    parser.add_argument('nside', type=int,
+                        help='NSIDE of the HEALPix map.')
+    parser.add_argument('--outfile', type=str,
+                        help='Path to an output file. Default to the cache '
+                             'name cube2hpx looks for, '
+                             'healpix_coord_N<nside>.npy. Required with '
+                             '--pixfile or --nest.')
+    parser.add_argument('--pixfile', type=str,
+                        help='Path to a numpy binary file of pixel indexes to '
+                             'compute, e.g. a sky cut. All pixels if omitted.')
+    parser.add_argument('--nthreads', type=int,
+                        help='Number of threads. Default to the number of '
+                             'CPUs.')
+    parser.add_argument('--chunk_size', type=int, default=1048576,
+                        help='Number of pixels converted per task.')
+    parser.add_argument('--nest', action='store_true',
+                        help='Use NESTED instead of RING pixel ordering.')
+    return parser
+
+
+def main(args):
+    """Run healpix_vectors from parsed command-line arguments."""
+    outfile = args.outfile
+    if not outfile:
+        # The default name is the full-sky RING cache read by cube2hpx.
+        if args.pixfile or args.nest:
+            raise ValueError('--outfile is required with --pixfile or --nest.')
+        outfile = 'healpix_coord_N{:d}.npy'.format(args.nside)
+    pix = None
+    if args.pixfile:
+        pix = np.load(args.pixfile, mmap_mode='r')
+    healpix_vectors(args.nside, pix=pix, outfile=outfile,
+                    nthreads=args.nthreads, chunk_size=args.chunk_size,
+                    nest=args.nest)
+
+
+if __name__ == '__main__':
+    parser = add_arguments(argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter))
+    main(parser.parse_args())
@@ -86,9 +86,8 @@ def interp_cube(z, zi=None, cube=None, read_from=None, outfile=None):
     np.save(outfile, icube)
 
 
-if __name__ == '__main__':
-    parser = argparse.ArgumentParser(
-        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+def add_arguments(parser):
+    """Add the interpcube command-line arguments to an argparse parser."""
     parser.add_argument('z', type=float,
                         help='Redshift of interest to interpolate from cubes.')
     parser.add_argument('--zi', type=float, nargs='*',
@@ -106,6 +105,16 @@ if __name__ == '__main__':
                              'parameters.')
     parser.add_argument('--outfile', type=str,
                         help='Path to an output file.')
-    args = parser.parse_args()
+    return parser
+
+
+def main(args):
+    """Run interp_cube from parsed command-line arguments."""
     interp_cube(args.z, zi=args.zi, cube=args.cube, read_from=args.read_from,
                 outfile=args.outfile)
+
+
+if __name__ == '__main__':
+    parser = add_arguments(argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter))
+    main(parser.parse_args())
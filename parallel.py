@@ -0,0 +1,221 @@
+"""
+Run cosmotile stages in parallel within a memory budget.
+
+The per-task estimates below are rough upper bounds on the peak resident
+memory of one call to each stage, counting the input arrays and the largest
+set of float64/int64 temporaries that are alive at the same time. Memory-mapped
+HEALPix coordinate caches live in the shared page cache and are not counted.
+
+"""
+from __future__ import print_function, division
+
+import errno
+import os
+import threading
+import traceback
+from multiprocessing import Pool, cpu_count
+try:
+    from multiprocessing import SimpleQueue
+except ImportError:
+    # Python 2
+    from multiprocessing.queues import SimpleQueue
+
+import numpy as np
+
+
+def cube2hpx_memory(nside=4096, sim_size=(128, 128, 128)):
+    """
+    Estimate the peak memory of a cube2hpx call in bytes.
+
+    The input cube, the three cube index arrays, the two temporaries used to
+    compute each of them and the output map, all 8 bytes per element.
+
+    """
+    npix = 12 * nside ** 2
+    return 8 * int(np.prod(sim_size)) + 6 * 8 * npix
+
+
+def hpx2sin_memory(nside=4096, size=7480):
+    """
+    Estimate the peak memory of a hpx2sin call in bytes.
+
+    The input HEALPix map and its scaled copy, plus the image arrays alive
+    during `hp.get_interp_val`: about 7 per image pixel (the x, y pixel grid,
+    the world coordinates, their valid-pixel copies and the output image)
+    and up to 16 per valid pixel inside `hp.get_interp_val` (the four
+    neighbour indexes and weights, their stacked copies and the weighted
+    values). Valid pixels cover pi/4 of the image, which adds up to about 20
+    float64/int64 arrays per image pixel; 24 are counted to leave headroom.
+
+    """
+    npix = 12 * nside ** 2
+    return 2 * 8 * npix + 24 * 8 * size ** 2
+
+
+def interpcube_memory(sim_size=(128, 128, 128)):
+    """
+    Estimate the peak memory of an interp_cube call in bytes.
+
+    The two bracketing cubes, their stacked copy, the weighted temporaries in
+    `np.average` and the output cube.
+
+    """
+    return 8 * 8 * int(np.prod(sim_size))
+
+
+def default_memory_budget(fraction=0.8):
+    """
+    Return the default memory budget in bytes.
+
+    Read from the COSMOTILE_MEMORY_GB environment variable if set. Otherwise
+    `fraction` of the available memory reported by /proc/meminfo, or of the
+    total physical memory if that is not available.
+
+    """
+    if os.environ.get('COSMOTILE_MEMORY_GB'):
+        return float(os.environ['COSMOTILE_MEMORY_GB']) * 1024 ** 3
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return fraction * int(line.split()[1]) * 1024
+    except IOError:
+        pass
+    return fraction * os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+
+
+# Queue on which each worker reports (task index, pid) when it starts a task.
+# SimpleQueue writes straight to its pipe, so the report is not lost if the
+# worker is killed right after.
+_started = None
+
+
+def _init_worker(started):
+    global _started
+    _started = started
+
+
+def _call(args):
+    """
+    Call `func(task)` in a worker, returning (True, result) on success or
+    (False, traceback) on failure, so the pool callback always runs.
+
+    """
+    index, func, task = args
+    _started.put((index, os.getpid()))
+    try:
+        return True, func(task)
+    except Exception:
+        return False, traceback.format_exc()
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError as e:
+        return e.errno != errno.ESRCH
+    return True
+
+
+def run_tasks(func, tasks, task_memory, memory_budget=None, processes=None,
+              key=None):
+    """
+    Map `func` over `tasks` on a process pool without exceeding a memory budget.
+
+    A task is only submitted to the pool once its estimated memory fits into
+    the budget left by the tasks still running. A task larger than the whole
+    budget runs on its own.
+
+    Parameters
+    ----------
+    func: callable
+        Function to call on each task. Must be picklable.
+    tasks: iterable
+        Arguments passed to `func`, one per call.
+    task_memory: float or callable
+        Estimated peak memory of one task in bytes, or a function returning
+        the estimate for a given task.
+    memory_budget: float or None, optional
+        Memory budget in bytes. Default to `default_memory_budget()`.
+    processes: integer or None, optional
+        Maximum number of worker processes. Default to the number of CPUs.
+    key: callable or None, optional
+        Sort tasks by this key before running them, so that tasks sharing
+        inputs, e.g. the same bracketing cubes or the same pointing, run back
+        to back and reuse the page cache.
+
+    Return
+    ------
+    out: list
+        Results of `func` in the order of the sorted tasks. A RuntimeError
+        is raised if any task failed, with the worker traceback, or if a
+        worker was killed while running a task.
+
+    """
+    tasks = list(tasks)
+    if key is not None:
+        tasks.sort(key=key)
+    if not callable(task_memory):
+        memory = task_memory
+        task_memory = lambda task: memory
+    if memory_budget is None:
+        memory_budget = default_memory_budget()
+    if processes is None:
+        processes = cpu_count()
+    processes = max(1, min(processes, len(tasks)))
+
+    in_use = [0]
+    cond = threading.Condition()
+
+    def release(need):
+        def callback(result):
+            with cond:
+                in_use[0] -= need
+                cond.notify_all()
+        return callback
+
+    # A worker killed by a signal, e.g. by the OOM killer, never returns its
+    # result, so poll for tasks whose worker has gone instead of waiting
+    # forever.
+    started = SimpleQueue()
+    pids = {}
+    results = []
+
+    def check_workers():
+        while not started.empty():
+            index, pid = started.get()
+            pids[index] = pid
+        for index, r in enumerate(results):
+            if (not r.ready() and index in pids
+                    and not _is_alive(pids[index])):
+                raise RuntimeError('Worker {:d} died while running task {!r}, '
+                                   'possibly killed by the OOM killer.'
+                                   .format(pids[index], tasks[index]))
+
+    pool = Pool(processes, _init_worker, (started,))
+    try:
+        for index, task in enumerate(tasks):
+            need = min(task_memory(task), memory_budget)
+            with cond:
+                while in_use[0] > 0 and in_use[0] + need > memory_budget:
+                    cond.wait(1)
+                    check_workers()
+                in_use[0] += need
+            results.append(pool.apply_async(_call, ((index, func, task),),
+                                            callback=release(need)))
+        pool.close()
+        while not all(r.ready() for r in results):
+            with cond:
+                cond.wait(1)
+            check_workers()
+        pool.join()
+    except BaseException:
+        pool.terminate()
+        raise
+    out = []
+    for task, r in zip(tasks, results):
+        ok, result = r.get()
+        if not ok:
+            raise RuntimeError('Task {!r} failed:\n{:s}'.format(task, result))
+        out.append(result)
+    return out
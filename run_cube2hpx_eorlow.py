@@ -4,12 +4,15 @@ This script shows how to run cube2hpx in parallel using multiprocessing module.
 """
 from __future__ import print_function, division
 
-from multiprocessing import Pool
-
 from .cube2hpx import cube2hpx
+from .hpxcoord import healpix_coord_cache
 from . import constants
+from . import parallel
 
 
+NSIDE = 4096
+SIM_SIZE = (128, 128, 128)
+SIM_RES = 7.8125
 freqs = constants.FREQ['EoR_low_80kHz']
 cube_dir = '/data3/piyanat/model/21cm/interpolated/'
 hpx_dir = '/data3/piyanat/model/21cm/healpix/'
@@ -22,10 +25,11 @@ hpxfiles = [hpx_dir + 'hpx_interp_delta_21cm_l128_{:.3f}MHz.fits'
 def call_cube2hpx(args):
     print(args)
     cube, hpx, f = args
-    cube2hpx(cube, hpx, f)
+    cube2hpx(cube, hpx, f, nside=NSIDE, sim_res=SIM_RES, sim_size=SIM_SIZE)
+
 
+# Build the pixel vector cache once so that the workers only memory-map it.
+healpix_coord_cache(NSIDE)
 
-workers = Pool(8)
-workers.map(call_cube2hpx, zip(cubefiles, hpxfiles, freqs))
-workers.close()
-workers.join()
+parallel.run_tasks(call_cube2hpx, zip(cubefiles, hpxfiles, freqs),
+                   parallel.cube2hpx_memory(nside=NSIDE, sim_size=SIM_SIZE))
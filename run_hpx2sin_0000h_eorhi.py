@@ -4,12 +4,15 @@ This script shows how to run hpx2sin in parallel using multiprocessing module.
 """
 from __future__ import print_function, division
 
-import multiprocessing
-
 from . import constants
+from . import parallel
 from .hpx2sin import hpx2sin
 
 
+# Input HEALPix nside and output image size
+NSIDE = 4096
+SIZE = 7480
+
 # Frequency information
 freqs = constants.FREQ['EoR_hi_80kHz']
 
@@ -25,7 +28,7 @@ dec = fov_dec
 # Caller function.
 def run_hpx2sin(args):
     infile, outfile = args
-    hpx2sin(infile, outfile, ra, dec, hpx_coord='C')
+    hpx2sin(infile, outfile, ra, dec, size=SIZE, hpx_coord='C')
 
 
 hpxdir = '/data3/piyanat/model/21cm/healpix/'
@@ -35,7 +38,6 @@ fitsdir = '/data3/piyanat/model/21cm/sin/'
 fitsfile = ['{:s}sin_interp_delta_21cm_l128_0.000h_{:.3f}MHz.fits'
             .format(fitsdir, f) for f in freqs]
 
-pool = multiprocessing.Pool(8)
-pool.map(run_hpx2sin, zip(hpxfile, fitsfile))
-pool.close()
-pool.join()
+# All tasks share one pointing, so they are kept in frequency order.
+parallel.run_tasks(run_hpx2sin, zip(hpxfile, fitsfile),
+                   parallel.hpx2sin_memory(nside=NSIDE, size=SIZE))
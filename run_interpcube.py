@@ -4,13 +4,13 @@ This script shows how to run interpcube in parallel using multiprocessing.
 """
 from __future__ import print_function, division
 
-import multiprocessing
 from glob import glob
 
 import numpy as np
 
 from . import interpcube
 from . import constants
+from . import parallel
 
 lsize = 128
 INDIR = '/data3/piyanat/model/21cm/original/'
@@ -40,7 +40,8 @@ def run(args):
     interpcube.interp_cube(i, zi=zi, cube=cube, outfile=o)
 
 
-pool = multiprocessing.Pool(8)
-pool.map(run, zip(z, out))
-pool.close()
-pool.join()
+# Sorting by redshift runs tasks that share the same bracketing cubes back to
+# back.
+parallel.run_tasks(run, zip(z, out),
+                   parallel.interpcube_memory(sim_size=(lsize, lsize, lsize)),
+                   key=lambda task: task[0])